@@ -1,39 +1,76 @@
 # pylint: disable=missing-module-docstring
 
+import argparse
+import functools
 import logging
 import hashlib
 import html
-import math
-import re
+import json
+import operator
 import os
+import re
 import shutil
+import string
+import subprocess
 import sys
 import urllib.parse
 
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, Iterable, List, Optional, Union
 
 import av  # type: ignore
 import pyexiv2  # type: ignore
-import tomli
 
-from PIL import Image, UnidentifiedImageError  # type: ignore
+from PIL import (  # type: ignore
+    ExifTags,
+    Image,
+    ImageOps,
+    UnidentifiedImageError,
+    features,
+)
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
 
 
 logger = logging.getLogger(__name__)
 
-RE_IMAGE_EXTENSION = re.compile(
-    r"\.(bmp|gif|jfif|jpeg|jpg|png|tif|tiff|tga|webp)$", re.IGNORECASE
+IMAGE_EXTENSIONS = frozenset(
+    {
+        ".bmp",
+        ".gif",
+        ".jfif",
+        ".jpeg",
+        ".jpg",
+        ".png",
+        ".tif",
+        ".tiff",
+        ".tga",
+        ".webp",
+    }
 )
 
-RE_VIDEO_EXTENSION = re.compile(
-    r"\.(3gp|avi|m4v|mp4|mkv|mov|mpeg|mpg|webm|wmv)$", re.IGNORECASE
+VIDEO_EXTENSIONS = frozenset(
+    {
+        ".3gp",
+        ".avi",
+        ".m4v",
+        ".mp4",
+        ".mkv",
+        ".mov",
+        ".mpeg",
+        ".mpg",
+        ".webm",
+        ".wmv",
+    }
 )
 
-RE_DATE_HAS_COLONS = re.compile(r"^\d{4}:\d{2}:\d{2}")
-
-RE_ENDS_WITH_OFFSET = re.compile(r"(-|\+)\d{2}:\d{2}$")
+MEDIA_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
 
 DEFAULT_PERMISSIONS = 0o755
 
@@ -43,17 +80,304 @@ ALBUM_SETTINGS_FILENAME = "album.toml"
 
 THUMBNAILS_DIR_NAME = "thumbnails"
 
+THUMBNAILS_URL_PREFIX = f"{urllib.parse.quote(THUMBNAILS_DIR_NAME)}/"
+
+MONTH_NAMES = (
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+)
+
+# Resized images with these extensions are saved with the JPEG settings
+JPEG_EXTENSIONS = frozenset({".jfif", ".jpeg", ".jpg"})
+
+# Thumbnails are always saved as JPEG
+THUMBNAIL_SAVE_OPTIONS: dict[str, Any] = {"quality": 80, "optimize": True}
+
+CACHE_FILENAME = ".preen_cache.json"
+
+# Color settings are written into the page's CSS, so they mustn't be able to end
+# a declaration, a rule, or the <style> element
+COLOR_PATTERN = re.compile(r"[^;{}<>\\\n]+")
+
+# Albums are listed in the gallery in order of their titles
+ALBUM_SORT_KEY = operator.attrgetter("settings.title")
+
+# Metadata keys to take each property from, in order of preference
+TITLE_KEYS = ("Xmp.dc.title", "Xmp.acdsee.caption", "Iptc.Application2.ObjectName")
+TIMESTAMP_KEYS = (
+    "Exif.Photo.DateTimeOriginal",
+    "Exif.Image.DateTime",
+    "Exif.Photo.DateTimeDigitized",
+)
+LOCATION_KEYS = (
+    "Exif.Image.ImageDescription",
+    "Iptc.Application2.Caption",
+    "Xmp.acdsee.notes",
+    "Xmp.dc.description",
+    "Xmp.exif.UserComment",
+    "Xmp.tiff.ImageDescription",
+)
+
+# Ways of running the per-file work of an album in parallel
+EXECUTORS = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+# The start of every page, up to and including the settings-dependent styles
+PAGE_HEAD_TEMPLATE = string.Template(
+    """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>$title</title>
+  <meta http-equiv="X-UA-Compatible" content="IE=edge">
+  <meta property="og:title" content="$title">
+  <meta name="twitter:title" content="$title">$favicon_html
+  <style>
+body {
+    color: $foreground_color;
+    background: $background_color;
+    font-family: sans-serif;
+}
+
+@media screen {
+    a {
+        color: $link_color
+    }
+}
+
+"""
+)
+
+# The part of the album page's stylesheet that doesn't depend on the settings
+ALBUM_STYLESHEET = """\
+html {
+    scroll-behavior: smooth;
+}
+
+@media print {
+    nav {
+        display: none;
+    }
+
+    .file img, .file video {
+        max-width: 100%;
+    }
+
+    p {
+        margin: 0 0 2em;
+    }
+
+    p.return-to-gallery {
+        display: none;
+    }
+}
+
+@media
+    screen and (max-width: 768px),
+
+    /* Tablets and smartphones */
+    screen and (hover: none)
+{
+    body {
+        margin: 1em;
+        padding: 0;
+    }
+
+    h1 {
+        margin-bottom: 0.7rem;
+    }
+
+    nav {
+        display: none;
+    }
+
+    .file {
+        text-align: center;
+        margin: 0 0 2em;
+    }
+
+    .file img, .file video {
+        max-width: 100%;
+        max-height: calc(100vh - 4.5em);
+    }
+}
+
+@media
+    screen and (min-width: 768px) and (hover: hover),
+
+    /* IE10 and IE11 (they don't support (hover: hover) */
+    screen and (min-width: 768px) and (-ms-high-contrast: none),
+    screen and (min-width: 768px) and (-ms-high-contrast: active)
+{
+    body {
+        margin: 0;
+        padding: 0;
+    }
+
+    h1 {
+        background: inherit;
+        position: fixed;
+        margin: 0;
+        padding: 2rem 4rem 1rem;
+        top: 0;
+        left: 0;
+        height: 2rem;
+        width: calc(100% - 10rem);
+    }
+
+    p.return-to-gallery {
+        background: inherit;
+        position: fixed;
+        margin: 0;
+        padding: 0 4rem;
+        top: 5rem;
+        height: 2rem;
+        width: calc(100% - 10rem);
+    }
+
+    nav {
+        top: 7rem;
+        left: 4rem;
+        max-height: calc(100% - 5.6rem);
+        width: calc(40% - 4rem);
+        display: flex;
+        flex-direction: row;
+        flex-wrap: wrap;
+        align-items: flex-start;
+        margin: -0.4rem -0.4rem 0;
+        overflow: auto;
+        position: fixed;
+    }
+
+    #photos {
+        margin-top: 7rem;
+        margin-left: calc(40% + 1em);
+        width: calc(60% - 5em);
+    }
+
+    nav a {
+        margin: 0.4em;
+        text-decoration: none;
+        position: relative;
+    }
+
+    nav a.video-thumbnail:before {
+        color: #f8f8f8;
+        background: #00000099;
+        content: "▶";
+        position: absolute;
+        top: calc(50% - 0.7em - 0.05em);
+        left: calc(50% - 0.5em - 0.3em);
+        font-size: 1.5em;
+        padding: 0.05em 0.2em 0.05em 0.4em;
+        width: 1em;
+        height: 1.4em;
+    }
+
+    .file {
+        text-align: center;
+        margin: -7rem 0 2em;
+        padding-top: 7em;
+    }
+
+    .file img, .file video {
+        max-width: 100%;
+        max-height: calc(100vh - 10.5em);
+    }
+}
+"""
+
+# The part of the gallery page's stylesheet that doesn't depend on the settings
+GALLERY_STYLESHEET = """\
+html {
+    scroll-behavior: smooth;
+}
+
+@media
+    screen and (max-width: 768px),
+
+    /* Tablets and smartphones */
+    screen and (hover: none)
+{
+    body {
+        margin: 1em;
+        padding: 0;
+    }
+
+    h1 {
+        margin-bottom: 0.7rem;
+    }
+
+    nav ul {
+        margin: 0;
+        padding: 0;
+        line-height: 2em;
+    }
+
+    li {
+        list-style: none;
+    }
+}
+
+@media
+    screen and (min-width: 768px) and (hover: hover),
+
+    /* IE10 and IE11 (they don't support (hover: hover) */
+    screen and (min-width: 768px) and (-ms-high-contrast: none),
+    screen and (min-width: 768px) and (-ms-high-contrast: active)
+{
+    body {
+        margin: 0;
+        padding: 0;
+    }
+
+    h1 {
+        margin: 0;
+        padding: 2rem 4rem 1rem;
+        height: 2rem;
+    }
+
+    nav ul {
+        margin: 0;
+        padding: 0 4rem;
+    }
+
+    li {
+        list-style: none;
+        margin-bottom: 1em;
+    }
+
+    p {
+        margin: 0 4rem;
+    }
+}
+"""
+
+# EXIF orientations that turn the image by 90 degrees when applied
+SIDEWAYS_ORIENTATIONS = frozenset({5, 6, 7, 8})
+
 
 def parse_gps_part(part: str) -> float:
     """Parse a GPS coordinate component into a number (e.g., 1200/100 = 1.2)."""
-    subparts = part.split("/", 2)
+    numerator, _, denominator = part.partition("/")
 
-    if len(subparts) == 1:
-        return float(subparts[0])
+    if denominator == "":
+        return float(numerator)
 
-    numerator = int(subparts[0])
-    denominator = int(subparts[1])
-    return numerator / denominator
+    return int(numerator) / int(denominator)
 
 
 def get_gps_dms_form(coordinate: str) -> str:
@@ -77,105 +401,221 @@ def get_gps_dms_form(coordinate: str) -> str:
     return f"{hours}° {minutes}' {seconds:.2f}\""
 
 
-def get_first_existing_attr(obj: dict, attr_names: List[str]) -> Any:
+def get_first_existing_attr(obj: dict, attr_names: Iterable[str]) -> Any:
     """Return the first attribute that exists in obj, or None."""
-    for attr_name in attr_names:
-        if attr_name in obj:
-            if isinstance(obj[attr_name], dict):
-                return list(obj[attr_name].values())[0]
-            return obj[attr_name]
+    # Metadata values are never None, so None from get() means a missing key
+    value = next(
+        (value for value in map(obj.get, attr_names) if value is not None), None
+    )
 
-    return None
+    # Language alternatives (e.g. Xmp.dc.title) are dicts; use the first one
+    if isinstance(value, dict):
+        return next(iter(value.values()), None)
+
+    return value
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(timestamp_str: str, default_time_offset: str) -> datetime:
+    """Parse an EXIF/XMP timestamp, adding the default offset if it has none."""
+    # The date may be in the format YYYY:MM:DD
+    # If it is, change it to YYYY-MM-DD
+    if timestamp_str[4:5] == ":" and timestamp_str[7:8] == ":":
+        timestamp_str = f"{timestamp_str[:4]}-{timestamp_str[5:7]}-{timestamp_str[8:]}"
+
+    # Check for an offset in the format +HH:MM or -HH:MM
+    if not (timestamp_str[-6:-5] in ("+", "-") and timestamp_str[-3:-2] == ":"):
+        timestamp_str = f"{timestamp_str}{default_time_offset}"
+
+    return datetime.fromisoformat(timestamp_str)
+
+
+def format_date(timestamp: datetime) -> str:
+    """Format the date as e.g. "1 January 2001", regardless of the locale."""
+    return f"{timestamp.day} {MONTH_NAMES[timestamp.month - 1]} {timestamp.year}"
+
+
+def get_location_html(location: str) -> str:
+    """Return a link to the location on DuckDuckGo Maps."""
+    return (
+        '<a href="https://duckduckgo.com/?iaxm=maps&q='
+        f"{urllib.parse.quote(location)}"
+        f'">🗺️ {html.escape(location)}</a>'
+    )
 
 
 def is_image_file(file_path: Path) -> bool:
     """Returns True if the path ends with an image extension."""
-    return RE_IMAGE_EXTENSION.search(str(file_path)) is not None
+    return file_path.suffix.lower() in IMAGE_EXTENSIONS
 
 
 def is_video_file(file_path: Path) -> bool:
     """Returns True if the path ends with a video extension."""
-    return RE_VIDEO_EXTENSION.search(str(file_path)) is not None
+    return file_path.suffix.lower() in VIDEO_EXTENSIONS
 
 
 def read_metadata(filename: Union[str, Path]) -> dict[str, str]:
     """Return a dict of EXIF, IPTC, and XMP extracted from a file."""
-    file = pyexiv2.Image(f"{filename}")
-
-    metadata = file.read_exif()
-    metadata.update(file.read_iptc())
-    metadata.update(file.read_xmp())
+    file = pyexiv2.Image(os.fspath(filename))
+    metadata: dict[str, str] = {}
 
-    file.close()
+    try:
+        # A damaged block shouldn't stop the others from being used
+        for read in (file.read_exif, file.read_iptc, file.read_xmp):
+            try:
+                metadata.update(read())
+            except RuntimeError as err:
+                logger.warning("Unable to read metadata from <%s>: %s", filename, err)
+    finally:
+        file.close()
 
     return metadata
 
 
-def strip_gps_data(filename: Union[str, Path]) -> None:
-    """Remove GPS data from a file."""
-    file = pyexiv2.Image(f"{filename}")
+def strip_gps_data(
+    filename: Union[str, Path], gps_keys: Optional[List[str]] = None
+) -> None:
+    """Remove GPS data from a file, using gps_keys instead of reading it if known."""
+    file = pyexiv2.Image(os.fspath(filename))
 
-    def remove_gps_keys(metadata: dict):
-        data_changed = False
+    try:
+        for prefix, read, modify in (
+            ("Exif.", file.read_exif, file.modify_exif),
+            ("Iptc.", file.read_iptc, file.modify_iptc),
+            ("Xmp.", file.read_xmp, file.modify_xmp),
+        ):
+            if gps_keys is None:
+                keys = [key for key in read() if "gps" in key.lower()]
+            else:
+                keys = [key for key in gps_keys if key.startswith(prefix)]
+
+            # Setting a key to None removes it
+            if len(keys) > 0:
+                modify(dict.fromkeys(keys))
+    finally:
+        file.close()
+
+
+def read_cache(cache_path: Path) -> dict:
+    """Return the contents of an album's cache file, or {} if unavailable."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            cache = json.load(cache_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as err:
+        logger.warning("Unable to read cache file <%s>: %s", cache_path, err)
+        return {}
+
+    if not isinstance(cache, dict):
+        return {}
+
+    return cache
+
+
+def write_cache(cache_path: Path, cache: dict) -> None:
+    """Atomically replace an album's cache file."""
+    temp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+
+    with open(temp_path, "w", encoding="utf-8") as cache_file:
+        cache_file.write(json.dumps(cache))
+
+    os.replace(temp_path, cache_path)
+
+
+def get_resize_scale(
+    image: Image.Image,
+    orientation: Optional[int],
+    max_width: Optional[int],
+    max_height: Optional[int],
+) -> float:
+    """Return the factor needed to fit the oriented image within the maximums."""
+    if orientation in SIDEWAYS_ORIENTATIONS:
+        width, height = image.height, image.width
+    else:
+        width, height = image.width, image.height
+
+    return min(
+        1,
+        1 if max_width is None else max_width / width,
+        1 if max_height is None else max_height / height,
+    )
 
-        for key, _value in metadata.items():
-            if "gps" in key.lower():
-                metadata[key] = None
-                data_changed = True
 
-        return metadata, data_changed
+def postprocess_jpeg(command: List[str], file_path: Path) -> None:
+    """Run a command (e.g. a JPEG optimiser) on a generated JPEG file."""
+    try:
+        subprocess.run(
+            [*command, os.fspath(file_path)], check=True, capture_output=True
+        )
+    except (OSError, subprocess.CalledProcessError) as err:
+        logger.warning("Unable to postprocess <%s>: %s", file_path, err)
 
-    metadata = file.read_exif()
-    metadata, data_changed = remove_gps_keys(metadata)
-    if data_changed:
-        file.modify_exif(metadata)
 
-    metadata = file.read_iptc()
-    metadata, data_changed = remove_gps_keys(metadata)
-    if data_changed:
-        file.modify_iptc(metadata)
+@functools.lru_cache(maxsize=16)
+def get_favicon_html(favicon_href: Optional[str]) -> str:
+    """Return the <link> tag for a favicon, or an empty string if there isn't one."""
+    if favicon_href is None:
+        return ""
 
-    metadata = file.read_xmp()
-    metadata, data_changed = remove_gps_keys(metadata)
-    if data_changed:
-        file.modify_xmp(metadata)
+    return (
+        "\n"
+        '  <link rel="icon" type="image/x-icon" '
+        f'href="{html.escape(favicon_href)}">'
+    )
 
-    file.close()
 
-    return metadata
+def get_page_head(settings: "PageSettings", title_html: str) -> str:
+    """Return the start of an HTML page, through the settings-dependent styles."""
+    return PAGE_HEAD_TEMPLATE.substitute(
+        title=title_html,
+        favicon_html=get_favicon_html(settings.favicon_href),
+        foreground_color=settings.foreground_color,
+        background_color=settings.background_color,
+        link_color=settings.link_color,
+    )
+
 
+def ensure_directory(dir_path: Path) -> None:
+    """Create a directory and its parents unless it already exists."""
+    # A single stat for the common case of a re-run; makedirs would also stat
+    # the parent and attempt a mkdir before finding that there's nothing to do
+    if not os.path.isdir(dir_path):
+        os.makedirs(dir_path, mode=DEFAULT_PERMISSIONS, exist_ok=True)
 
-def is_sideways_orientation(orientation: Optional[int]) -> bool:
-    """Return True if the orientation indicates rotation of 90 or 270 deg."""
-    # 1 = Horizontal (normal)
-    # 2 = Mirror horizontal
-    # 3 = Rotate 180
-    # 4 = Mirror vertical
-    # 5 = Mirror horizontal and rotate 270 CW
-    # 6 = Rotate 90 CW
-    # 7 = Mirror horizontal and rotate 90 CW
-    # 8 = Rotate 270 CW
-    return orientation in [5, 6, 7, 8]
 
+def write_index_file(index_file_path: Path, parts: List[str]) -> None:
+    """Write an HTML page that was built up as a list of strings."""
+    content = "".join(parts).encode("utf-8")
 
-def orient_image(image: Image, orientation: Optional[int]) -> Image:
-    """Rotate/flip the image according to the EXIF rotation string."""
-    if orientation in [2, 5, 7]:
-        image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    # Leave an unchanged page alone so that its modification time, and any
+    # caches keyed on it, stay valid
+    try:
+        with open(index_file_path, "rb") as index_file:
+            if index_file.read() == content:
+                logger.debug("Index is unchanged: %s", index_file_path)
+                return
+    except FileNotFoundError:
+        pass
 
-    if orientation in [4]:
-        image = image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    with open(index_file_path, "wb") as index_file:
+        index_file.write(content)
 
-    if orientation in [5, 8]:
-        image = image.transpose(Image.Transpose.ROTATE_90)
 
-    if orientation in [3]:
-        image = image.transpose(Image.Transpose.ROTATE_180)
+def create_thumbnail(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Shrink the image to fit within width x height and centre it on black."""
+    image.thumbnail((width, height), Image.Resampling.BILINEAR)
 
-    if orientation in [6, 7]:
-        image = image.transpose(Image.Transpose.ROTATE_270)
+    # Nothing to pad, and nothing to convert for saving as a JPEG
+    if image.size == (width, height) and image.mode == "RGB":
+        return image
+
+    thumbnail_image = Image.new("RGB", (width, height), (0, 0, 0))
+    thumbnail_image.paste(
+        image, ((width - image.width) // 2, (height - image.height) // 2)
+    )
 
-    return image
+    return thumbnail_image
 
 
 class SettingsFileError(RuntimeError):
@@ -183,6 +623,7 @@ class SettingsFileError(RuntimeError):
 
 
 # pylint: disable=too-many-instance-attributes
+@dataclass(slots=True)
 class PageSettings:
     """Stores settings for gallery and album generation."""
 
@@ -196,6 +637,8 @@ class PageSettings:
     strip_gps_data: bool = True
     max_image_width: Optional[int] = None
     max_image_height: Optional[int] = None
+    jpeg_quality: int = 85
+    postprocess_command: Optional[List[str]] = None
     thumbnail_width: int = 100
     thumbnail_height: int = 100
     default_time_offset: str = "+00:00"
@@ -205,27 +648,31 @@ class PageSettings:
     background_color: str = "#333333"
     link_color: str = "#44aadd"
     favicon_href: Optional[str] = None
-    strip_gps_data_from: List[str] = []
+    strip_gps_data_from: List[str] = field(default_factory=list)
+    executor: str = "process"
+
+    def check_colors(self):
+        """Raise SettingsFileError if a color setting can't be used in CSS."""
+        for attr in ("foreground_color", "background_color", "link_color"):
+            value = getattr(self, attr)
+            if not isinstance(value, str) or not COLOR_PATTERN.fullmatch(value):
+                raise SettingsFileError(f"Invalid {attr} <{value}>")
 
     def clone(self):
         """Create a copy of the settings, except for the title and output directory name."""
-        copy = PageSettings()
-
-        for attr in dir(self):
-            if not (
-                attr.startswith("__")
-                or callable(getattr(self, attr))
-                or (attr in ["title", "output_directory"])
-            ):
-                setattr(copy, attr, getattr(self, attr))
-
-        return copy
+        return replace(self, title=None, output_directory=None)
 
     def debug_print(self):
         """Log the settings."""
-        for attr in dir(self):
-            if not (attr.startswith("__") or callable(getattr(self, attr))):
-                logger.debug("%24s = %s", attr, getattr(self, attr))
+        for attr in SETTINGS:
+            logger.debug("%24s = %s", attr, getattr(self, attr))
+
+
+# Names of the settings, in the order they're declared in PageSettings
+SETTINGS = tuple(setting.name for setting in fields(PageSettings))
+
+# For checking which keys in a settings file are settings
+SETTING_NAMES = frozenset(SETTINGS)
 
 
 class ImageFile:
@@ -238,86 +685,112 @@ class ImageFile:
     thumbnail_filename: str
     url: str
     thumbnail_url: str
+    alt_text: str
 
     title: Optional[str] = None
     timestamp: Optional[datetime] = None
     location: Optional[str] = None  # Description, caption, or GPS coordinates
-    orientation: Optional[int] = None
+    location_html: Optional[str] = None
 
     width: int
     height: int
 
-    def __init__(self, path: Path, settings: PageSettings):
-        logger.debug("Reading metadata for <%s>", path)
+    mtime_ns: int
+    should_strip_gps_data: bool
+    # None if unknown, in which case the file has to be checked
+    gps_keys: Optional[List[str]]
 
+    # Identifies the file version and settings the metadata fields came from
+    metadata_key: list
+
+    # Describes the metadata and generated outputs; stored in the album's
+    # cache file
+    cache_entry: Optional[dict] = None
+
+    def __init__(
+        self, path: Path, settings: PageSettings, cache_entry: Optional[dict] = None
+    ):
         self.path = path
         self.settings = settings
 
         self.filename = path.name
         self.thumbnail_filename = f"{path.stem}.jpg"
         self.url = urllib.parse.quote(self.filename)
-        self.thumbnail_url = urllib.parse.quote(
-            f"{THUMBNAILS_DIR_NAME}/{self.thumbnail_filename}"
+        self.thumbnail_url = THUMBNAILS_URL_PREFIX + urllib.parse.quote(
+            self.thumbnail_filename
+        )
+
+        self.should_strip_gps_data = (
+            settings.strip_gps_data or path.name in settings.strip_gps_data_from
         )
 
-        metadata = read_metadata(path)
+        stat = path.stat()
+        self.mtime_ns = stat.st_mtime_ns
+
+        self.metadata_key = [
+            stat.st_mtime_ns,
+            stat.st_size,
+            settings.show_timestamps,
+            settings.default_time_offset,
+            self.should_strip_gps_data,
+        ]
+
+        if (
+            cache_entry is not None
+            and cache_entry.get("metadata_key") == self.metadata_key
+        ):
+            logger.debug("Using cached metadata for <%s>", path)
+            self.title = cache_entry["title"]
+            self.location = cache_entry["location"]
+            self.gps_keys = cache_entry.get("gps_keys")
+
+            if cache_entry["timestamp"] is not None:
+                self.timestamp = datetime.fromisoformat(cache_entry["timestamp"])
+        else:
+            self.read_file_metadata()
 
-        self.title = get_first_existing_attr(
-            metadata,
-            [
-                "Xmp.dc.title",
-                "Xmp.acdsee.caption",
-                "Iptc.Application2.ObjectName",
-            ],
+        # Escaped once here, since both the thumbnail and the file use it
+        self.alt_text = html.escape(
+            self.title if self.title is not None else self.filename
         )
 
+        # Built here, where files are processed in parallel, rather than while
+        # the album page is written
+        if self.location is not None:
+            self.location_html = get_location_html(self.location)
+
+    def read_file_metadata(self) -> None:
+        """Set the title, timestamp, and location from the file's metadata."""
+        logger.debug("Reading metadata for <%s>", self.path)
+
+        settings = self.settings
+        metadata = read_metadata(self.path)
+
+        self.gps_keys = [key for key in metadata if "gps" in key.lower()]
+
+        self.title = get_first_existing_attr(metadata, TITLE_KEYS)
+
         if isinstance(self.title, str):
             self.title = self.title.strip()
             if self.title == "":
                 self.title = None
 
         if settings.show_timestamps:
-            timestamp_str = get_first_existing_attr(
-                metadata,
-                [
-                    "Exif.Photo.DateTimeOriginal",
-                    "Exif.Image.DateTime",
-                    "Exif.Photo.DateTimeDigitized",
-                ],
-            )
+            timestamp_str = get_first_existing_attr(metadata, TIMESTAMP_KEYS)
 
             if timestamp_str is not None:
-                # The date may be in the format YYYY:MM:DD
-                # If it is, change it to YYYY-MM-DD
-                if RE_DATE_HAS_COLONS.search(timestamp_str):
-                    timestamp_str = timestamp_str.replace(":", "-", 2)
-
-                if not RE_ENDS_WITH_OFFSET.search(timestamp_str):
-                    timestamp_str = f"{timestamp_str}{settings.default_time_offset}"
-
-                self.timestamp = datetime.fromisoformat(timestamp_str)
-
-        self.location = get_first_existing_attr(
-            metadata,
-            [
-                "Exif.Image.ImageDescription",
-                "Iptc.Application2.Caption",
-                "Xmp.acdsee.notes",
-                "Xmp.dc.description",
-                "Xmp.exif.UserComment",
-                "Xmp.tiff.ImageDescription",
-            ],
-        )
+                self.timestamp = parse_timestamp(
+                    timestamp_str, settings.default_time_offset
+                )
+
+        self.location = get_first_existing_attr(metadata, LOCATION_KEYS)
 
         if isinstance(self.location, str):
             self.location = self.location.strip()
             if self.location == "":
                 self.location = None
 
-        if (
-            not settings.strip_gps_data
-            and not self.path.name in self.settings.strip_gps_data_from
-        ):
+        if not self.should_strip_gps_data:
             if (
                 self.location is None
                 and "Exif.GPSInfo.GPSLatitudeRef" in metadata
@@ -332,79 +805,150 @@ class ImageFile:
                     f"{metadata['Exif.GPSInfo.GPSLongitudeRef']}"
                 )
 
-        orientation = get_first_existing_attr(
-            metadata,
-            [
-                "Exif.Image.Orientation",
-            ],
-        )
+    def process(
+        self,
+        output_dir_path: Path,
+        thumbnails_dir_path: Path,
+        cache_entry: Optional[dict] = None,
+    ) -> None:
+        """Resize image if necessary, generate thumbnail, and copy to output dir.
+
+        If cache_entry shows that the outputs were generated from the current
+        version of the file using the current settings, nothing is done.
+        """
+        output_path = output_dir_path.joinpath(self.url)
+        thumbnail_path = thumbnails_dir_path.joinpath(self.thumbnail_filename)
 
-        if orientation is not None:
-            self.orientation = int(orientation)
+        signature = [
+            self.mtime_ns,
+            self.settings.max_image_width,
+            self.settings.max_image_height,
+            self.settings.thumbnail_width,
+            self.settings.thumbnail_height,
+            self.settings.jpeg_quality,
+            self.settings.postprocess_command,
+            self.should_strip_gps_data,
+        ]
+
+        if (
+            cache_entry is not None
+            and cache_entry.get("signature") == signature
+            and output_path.exists()
+            and thumbnail_path.exists()
+        ):
+            logger.debug("Skipping <%s>; outputs are up to date", self.path)
+            self.width = cache_entry["width"]
+            self.height = cache_entry["height"]
+            self.cache_entry = self.get_cache_entry(signature)
+            return
 
-    def process(self, output_dir_path: Path, thumbnails_dir_path: Path) -> None:
-        """Resize image if necessary, generate thumbnail, and copy to output dir."""
         logger.debug("Processing <%s>", self.path)
 
         image = Image.open(self.path)
 
-        # Resize photos to maximum dimensions
         max_image_width = self.settings.max_image_width
         max_image_height = self.settings.max_image_height
 
-        if is_sideways_orientation(self.orientation):
-            max_image_width, max_image_height = max_image_height, max_image_width
+        # Only the header has been parsed so far, which is enough to work out
+        # whether the image needs to be rotated or resized
+        orientation = image.getexif().get(ExifTags.Base.Orientation)
+        scale = get_resize_scale(image, orientation, max_image_width, max_image_height)
 
-        image.thumbnail((max_image_width, max_image_height))
+        if scale == 1 and orientation in (None, 1):
+            # Copy the file as is instead of re-encoding it
+            shutil.copy2(self.path, output_path)
 
-        self.width = image.width
-        self.height = image.height
+            # The copy has the same metadata as the original, so the keys that
+            # were read from the original are the ones to remove
+            if self.should_strip_gps_data and self.gps_keys != []:
+                strip_gps_data(output_path, self.gps_keys)
+        else:
+            # Let libjpeg decode at a reduced scale; doubled, like
+            # Image.thumbnail does, to leave room for a proper resize
+            if image.format == "JPEG" and scale < 1:
+                image.draft(
+                    None,
+                    (int(image.width * scale * 2), int(image.height * scale * 2)),
+                )
 
-        # Save image
-        output_path = output_dir_path.joinpath(self.url)
+            # Rotate/flip the image according to its EXIF orientation; this
+            # also removes the orientation tag, so it isn't rotated twice
+            ImageOps.exif_transpose(image, in_place=True)
 
-        if not output_path.exists():
-            image.save(output_path, exif=image.getexif())
+            # Resize photos to maximum dimensions
+            if scale < 1:
+                image.thumbnail(
+                    (max_image_width or image.width, max_image_height or image.height),
+                    Image.Resampling.LANCZOS,
+                )
 
-        if (
-            self.settings.strip_gps_data
-            or self.path.name in self.settings.strip_gps_data_from
-        ):
-            strip_gps_data(output_path)
+            exif = image.getexif()
 
-        # Create thumbnail
-        image = orient_image(image, self.orientation)
-        image.thumbnail((self.settings.thumbnail_width, self.settings.thumbnail_height))
+            # Drop the GPS IFD before saving, so the file never contains it
+            if self.should_strip_gps_data:
+                exif.pop(ExifTags.IFD.GPSInfo, None)
 
-        # Centre the thumbnail in its container
-        thumbnail_position = (
-            math.floor((self.settings.thumbnail_width - image.width) / 2),
-            math.floor((self.settings.thumbnail_height - image.height) / 2),
-        )
+            save_options: dict[str, Any] = {}
+
+            if output_path.suffix.lower() in JPEG_EXTENSIONS:
+                save_options = {
+                    "quality": self.settings.jpeg_quality,
+                    "optimize": True,
+                    "progressive": True,
+                }
+
+            image.save(output_path, exif=exif, **save_options)
+
+            if self.should_strip_gps_data:
+                self.strip_reencoded_gps_data(output_path)
+
+        self.width = image.width
+        self.height = image.height
 
-        thumbnail_image = Image.new(
-            "RGB",
-            (self.settings.thumbnail_width, self.settings.thumbnail_height),
-            (0, 0, 0),
+        # Create thumbnail
+        thumbnail_image = create_thumbnail(
+            image, self.settings.thumbnail_width, self.settings.thumbnail_height
         )
-        thumbnail_image.paste(image, thumbnail_position)
+        thumbnail_image.save(thumbnail_path, **THUMBNAIL_SAVE_OPTIONS)
 
-        # Save thumbnail
-        thumbnail_path = thumbnails_dir_path.joinpath(self.thumbnail_filename)
+        if self.settings.postprocess_command:
+            if output_path.suffix.lower() in JPEG_EXTENSIONS:
+                postprocess_jpeg(self.settings.postprocess_command, output_path)
 
-        if not thumbnail_path.exists():
-            thumbnail_image.save(thumbnail_path)
+            postprocess_jpeg(self.settings.postprocess_command, thumbnail_path)
+
+        self.cache_entry = self.get_cache_entry(signature)
+
+    def strip_reencoded_gps_data(self, output_path: Path) -> None:
+        """Remove GPS data that Image.save carried over outside of EXIF."""
+        # Pillow copies XMP and IPTC blocks into some formats (e.g. TIFF); the
+        # EXIF GPS IFD was already dropped before saving
+        if self.gps_keys is None:
+            strip_gps_data(output_path)
+            return
+
+        other_gps_keys = [key for key in self.gps_keys if not key.startswith("Exif.")]
+        if len(other_gps_keys) > 0:
+            strip_gps_data(output_path, other_gps_keys)
+
+    def get_cache_entry(self, signature: list) -> dict:
+        """Describe the file's metadata and outputs for the album's cache file."""
+        return {
+            "signature": signature,
+            "width": self.width,
+            "height": self.height,
+            "metadata_key": self.metadata_key,
+            "title": self.title,
+            "timestamp": None if self.timestamp is None else self.timestamp.isoformat(),
+            "location": self.location,
+            "gps_keys": self.gps_keys,
+        }
 
     def get_thumbnail_html(self, idx: int) -> str:
         """Generate HTML snippet for the image's thumbnail."""
-        if self.title is not None:
-            alt_tag = f'alt="{html.escape(self.title)}" '
-        else:
-            alt_tag = f'alt="{html.escape(self.filename)}" '
-
         img_tag = (
             f'<img src="{self.thumbnail_url}" '
-            f"{alt_tag}"
+            f'alt="{self.alt_text}" '
             f'width="{self.settings.thumbnail_width}" '
             f'height="{self.settings.thumbnail_height}">'
         )
@@ -415,12 +959,9 @@ class ImageFile:
         """Generate HTML snippet for the image."""
         parts = []
 
-        if self.title is not None:
-            alt_tag = f'alt="{html.escape(self.title)}"'
-        else:
-            alt_tag = f'alt="{html.escape(self.filename)}"'
-
-        parts.append(f'<a href="{self.url}"><img src="{self.url}" ' f"{alt_tag}></a>")
+        parts.append(
+            f'<a href="{self.url}"><img src="{self.url}" alt="{self.alt_text}"></a>'
+        )
 
         if self.title is not None:
             parts.append(self.title.replace("\n", "<br>"))
@@ -428,17 +969,12 @@ class ImageFile:
         if self.timestamp is not None:
             parts.append(
                 f'<time datetime="{self.timestamp}">'
-                f'{self.timestamp.strftime("%-d %B %Y")}'
+                f"{format_date(self.timestamp)}"
                 f"</time>"
             )
 
-        if self.location is not None:
-            location_text = urllib.parse.quote(self.location).replace("\n", "<br>")
-            parts.append(
-                '<a href="https://duckduckgo.com/?iaxm=maps&q='
-                f"{location_text}"
-                f'">🗺️ {html.escape(self.location)}</a>'
-            )
+        if self.location_html is not None:
+            parts.append(self.location_html)
 
         return "<br>".join(parts)
 
@@ -452,10 +988,12 @@ class VideoFile:
     thumbnail_filename: str
     url: str
     thumbnail_url: str
+    alt_text: str
 
     title: Optional[str] = None
     timestamp: Optional[datetime] = None
     location: Optional[str] = None  # Description, caption, or GPS coordinates
+    location_html: Optional[str] = None
     width: Optional[int] = None
     height: Optional[int] = None
     orientation: Optional[int] = None
@@ -469,56 +1007,31 @@ class VideoFile:
         self.filename = path.name
         self.thumbnail_filename = f"{path.stem}.jpg"
         self.url = urllib.parse.quote(self.filename)
-        self.thumbnail_url = urllib.parse.quote(
-            f"{THUMBNAILS_DIR_NAME}/{self.thumbnail_filename}"
+        self.thumbnail_url = THUMBNAILS_URL_PREFIX + urllib.parse.quote(
+            self.thumbnail_filename
         )
 
         # TODO: Figure out a way to extract metadata directly from the video file
         # TODO: Look for .XMP
         metadata = read_metadata(path.with_name(f"{path.name}.xmp"))
 
-        self.title = get_first_existing_attr(
-            metadata,
-            [
-                "Xmp.dc.title",
-                "Xmp.acdsee.caption",
-                "Iptc.Application2.ObjectName",
-            ],
+        self.title = get_first_existing_attr(metadata, TITLE_KEYS)
+
+        # Escaped once here, since both the thumbnail and the file use it
+        self.alt_text = html.escape(
+            self.title if self.title is not None else self.filename
         )
 
         if settings.show_timestamps:
-            timestamp_str = get_first_existing_attr(
-                metadata,
-                [
-                    "Exif.Photo.DateTimeOriginal",
-                    "Exif.Image.DateTime",
-                    "Exif.Photo.DateTimeDigitized",
-                ],
-            )
+            timestamp_str = get_first_existing_attr(metadata, TIMESTAMP_KEYS)
 
             if timestamp_str is not None:
-                # The date may be in the format YYYY:MM:DD
-                # If it is, change it to YYYY-MM-DD
-                if RE_DATE_HAS_COLONS.search(timestamp_str):
-                    timestamp_str = timestamp_str.replace(":", "-", 2)
-
-                if not RE_ENDS_WITH_OFFSET.search(timestamp_str):
-                    timestamp_str = f"{timestamp_str}{settings.default_time_offset}"
-
-                self.timestamp = datetime.fromisoformat(timestamp_str)
+                self.timestamp = parse_timestamp(
+                    timestamp_str, settings.default_time_offset
+                )
 
         if not settings.strip_gps_data:
-            self.location = get_first_existing_attr(
-                metadata,
-                [
-                    "Exif.Image.ImageDescription",
-                    "Iptc.Application2.Caption",
-                    "Xmp.acdsee.notes",
-                    "Xmp.dc.description",
-                    "Xmp.exif.UserComment",
-                    "Xmp.tiff.ImageDescription",
-                ],
-            )
+            self.location = get_first_existing_attr(metadata, LOCATION_KEYS)
 
             if (
                 self.location is None
@@ -534,16 +1047,16 @@ class VideoFile:
                     f"{metadata['Exif.GPSInfo.GPSLongitudeRef']}"
                 )
 
-        orientation = get_first_existing_attr(
-            metadata,
-            [
-                "Exif.Image.Orientation",
-            ],
-        )
+        orientation = metadata.get("Exif.Image.Orientation")
 
         if orientation is not None:
             self.orientation = int(orientation)
 
+        # Built here, where files are processed in parallel, rather than while
+        # the album page is written
+        if self.location is not None:
+            self.location_html = get_location_html(self.location)
+
     def process(self, output_path: Path, thumbnails_dir_path: Path) -> None:
         """Re-encode video if necessary, generate thumbnail, and copy to output dir."""
         logger.debug("Processing <%s>", self.path)
@@ -551,49 +1064,49 @@ class VideoFile:
         # TODO: handle filename change for MP4-converted files
 
         output_path = output_path.joinpath(self.url)
+        thumbnail_path = thumbnails_dir_path.joinpath(self.thumbnail_filename)
+
+        # copy2 keeps the modification time, so an output older than the
+        # source means the source has changed since it was copied
+        source_mtime = self.path.stat().st_mtime
 
-        if not output_path.exists():
+        if not output_path.exists() or output_path.stat().st_mtime < source_mtime:
             shutil.copy2(self.path, output_path)
 
         # TODO: Strip GPS data from video, if indicated
 
+        if thumbnail_path.exists() and thumbnail_path.stat().st_mtime >= source_mtime:
+            logger.debug("Skipping thumbnail for <%s>; it is up to date", self.path)
+            return
+
         # Create video thumbnail
         container = av.open(str(self.path))
-        frames = container.decode(video=0)  # Get the first video stream
-        first_frame = next(frames)
-        image = first_frame.to_image()
+        try:
+            stream = container.streams.video[0]  # Get the first video stream
 
-        image.thumbnail((self.settings.thumbnail_width, self.settings.thumbnail_height))
+            # The thumbnail only needs one frame, and keyframes are the only ones
+            # that can be decoded without decoding the frames before them
+            stream.codec_context.skip_frame = "NONKEY"
+            stream.thread_type = "AUTO"
 
-        # Centre the thumbnail in its container
-        thumbnail_position = (
-            math.floor((self.settings.thumbnail_width - image.width) / 2),
-            math.floor((self.settings.thumbnail_height - image.height) / 2),
-        )
+            first_frame = next(container.decode(stream))
+            image = first_frame.to_image()
+        finally:
+            container.close()
 
-        thumbnail_image = Image.new(
-            "RGB",
-            (self.settings.thumbnail_width, self.settings.thumbnail_height),
-            (0, 0, 0),
+        thumbnail_image = create_thumbnail(
+            image, self.settings.thumbnail_width, self.settings.thumbnail_height
         )
-        thumbnail_image.paste(image, thumbnail_position)
+        thumbnail_image.save(thumbnail_path, **THUMBNAIL_SAVE_OPTIONS)
 
-        # Save thumbnail
-        thumbnail_path = Path(thumbnails_dir_path.joinpath(self.thumbnail_filename))
-
-        if not thumbnail_path.exists():
-            thumbnail_image.save(thumbnail_path)
+        if self.settings.postprocess_command:
+            postprocess_jpeg(self.settings.postprocess_command, thumbnail_path)
 
     def get_thumbnail_html(self, idx: int) -> str:
         """Generate HTML snippet for the video's thumbnail."""
-        if self.title is not None:
-            alt_tag = f'alt="{html.escape(self.title)}" '
-        else:
-            alt_tag = f'alt="{html.escape(self.filename)}" '
-
         img_tag = (
             f'<img src="{self.thumbnail_url}" '
-            f"{alt_tag}"
+            f'alt="{self.alt_text}" '
             f'width="{self.settings.thumbnail_width}" '
             f'height="{self.settings.thumbnail_height}">'
         )
@@ -612,21 +1125,42 @@ class VideoFile:
         if self.timestamp is not None:
             parts.append(
                 f'<time datetime="{self.timestamp}">'
-                f'{self.timestamp.strftime("%-d %B %Y")}'
+                f"{format_date(self.timestamp)}"
                 f"</time>"
             )
 
-        if self.location is not None:
-            location_text = urllib.parse.quote(self.location).replace("\n", "<br>")
-            parts.append(
-                '<a href="https://duckduckgo.com/?iaxm=maps&q='
-                f"{location_text}"
-                f'">🗺️ {html.escape(self.location)}</a>'
-            )
+        if self.location_html is not None:
+            parts.append(self.location_html)
 
         return "<br>".join(parts)
 
 
+def process_media_file(
+    file_path: Path,
+    settings: PageSettings,
+    output_path: Path,
+    thumbnails_path: Path,
+    cache_entry: Optional[dict],
+) -> Union[ImageFile, VideoFile, None]:
+    """Read and process an image or video file; runs in a worker process."""
+    if is_image_file(file_path):
+        try:
+            image_file = ImageFile(file_path, settings, cache_entry)
+            image_file.process(output_path, thumbnails_path, cache_entry)
+            return image_file
+        except UnidentifiedImageError:
+            # TODO: Figure out what kind of error pyexiv2 will throw if nonexistent
+            # TODO: Print some kind of error message
+            return None
+
+    if is_video_file(file_path):
+        video_file = VideoFile(file_path, settings)
+        video_file.process(output_path, thumbnails_path)
+        return video_file
+
+    return None
+
+
 class Album:
     """Looks for images in a directory and generates an album page for them."""
 
@@ -635,6 +1169,7 @@ class Album:
     output_path: Path
     thumbnails_path: Path
     include_in_gallery: bool
+    title_html: str
 
     # Values are inherited from the gallery's page settings if not specified
     settings: PageSettings
@@ -643,12 +1178,12 @@ class Album:
         self.path = path
         self.output_base_path = output_base_path
 
-    def generate(self, default_settings: PageSettings):
+    def generate(self, default_settings: PageSettings, executor: Executor):
         """Start the process of album generation."""
         logger.debug("Generating album for <%s>", self.path)
 
         self.read_settings(default_settings)
-        self.create_album()
+        self.create_album(executor)
 
     def read_settings(self, default_settings: PageSettings):
         """Retrieve the settings for the album."""
@@ -656,25 +1191,22 @@ class Album:
 
         settings_path = self.path.joinpath(ALBUM_SETTINGS_FILENAME)
 
-        if not os.path.exists(settings_path):
+        # Opening the file is the existence check
+        try:
+            with open(settings_path, "rb") as settings_file:
+                settings = tomllib.load(settings_file)
+        except FileNotFoundError as err:
             raise SettingsFileError(
                 f"Unable to find settings file at <{settings_path}>"
-            )
+            ) from err
+        except tomllib.TOMLDecodeError as err:
+            raise SettingsFileError(f"Unable to read album settings: {err}") from err
 
-        with open(settings_path, "rb") as settings_file:
-            try:
-                settings = tomli.load(settings_file)
-            except tomli.TOMLDecodeError as err:
-                raise SettingsFileError(
-                    f"Unable to read album settings: {err}"
-                ) from err
-
-        for attr in dir(self.settings):
-            if attr.startswith("__") or attr in ["path", "output_path"]:
-                continue
+        for attr in SETTING_NAMES & settings.keys():
+            setattr(self.settings, attr, settings[attr])
 
-            if attr in settings:
-                setattr(self.settings, attr, settings[attr])
+        self.settings.check_colors()
+        self.title_html = html.escape(str(self.settings.title))
 
         if self.settings.output_directory is not None:
             self.settings.output_directory = self.settings.output_directory.strip()
@@ -709,274 +1241,132 @@ class Album:
 
         logger.debug("Output path: %s", self.output_path)
 
-    def create_album(self):
-        """Process the image and video files."""
-        os.makedirs(self.thumbnails_path, mode=DEFAULT_PERMISSIONS, exist_ok=True)
-
-        files = []
-
-        for file_path in Path(self.path).glob("*"):
-            if is_image_file(file_path):
-                try:
-                    image_file = ImageFile(file_path, self.settings)
-                    image_file.process(self.output_path, self.thumbnails_path)
-                    files.append(image_file)
-                except UnidentifiedImageError:
-                    # TODO: Figure out what kind of error pyexiv2 will throw if nonexistent
-                    # TODO: Print some kind of error message
-                    pass
-            elif is_video_file(file_path):
-                video_file = VideoFile(file_path, self.settings)
-                video_file.process(self.output_path, self.thumbnails_path)
-                files.append(video_file)
+    def create_album(self, executor: Executor):
+        """Process the image and video files using the given executor."""
+        ensure_directory(self.thumbnails_path)
 
-        if self.settings.sort_key == "timestamp":
-            files.sort(key=lambda file: file.timestamp or datetime.now(timezone.utc))
-        elif self.settings.sort_key == "filename":
-            files.sort(key=lambda file: file.filename)
-
-        self.write_album_index(files)
-
-    def write_album_index(self, files: List[Union[ImageFile, VideoFile]]):
-        """Generate an HTML file for an album."""
-        index_file_path = self.output_path.joinpath("index.html")
-
-        if self.settings.favicon_href is None:
-            favicon_html = ""
-        else:
-            favicon_html = (
-                "\n"
-                '  <link rel="icon" type="image/x-icon" '
-                f'href="{self.settings.favicon_href}">'
-            )
-
-        with open(index_file_path, "w", encoding="utf-8") as index_file:
-            index_file.write(
-                f"""\
-<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="utf-8">
-  <title>{self.settings.title}</title>
-  <meta http-equiv="X-UA-Compatible" content="IE=edge">
-  <meta property="og:title" content="{self.settings.title}">
-  <meta name="twitter:title" content="{self.settings.title}">{favicon_html}
-  <style>
-body {{
-    color: {self.settings.foreground_color};
-    background: {self.settings.background_color};
-    font-family: sans-serif;
-}}
+        cache_path = self.output_path.joinpath(CACHE_FILENAME)
+        cache = read_cache(cache_path)
+        new_cache = {}
 
-@media screen {{
-    a {{
-        color: {self.settings.link_color}
-    }}
-}}
+        files = []
 
-"""
+        # DirEntry.is_file usually answers from the directory listing itself,
+        # without another stat call; it's only asked about media files, and a
+        # Path is only made for the files that are kept
+        with os.scandir(self.path) as entries:
+            file_paths = [
+                Path(entry.path)
+                for entry in entries
+                if os.path.splitext(entry.name)[1].lower() in MEDIA_EXTENSIONS
+                and entry.is_file()
+            ]
+
+        # Files are independent of each other, so process them in parallel
+        futures = [
+            executor.submit(
+                process_media_file,
+                file_path,
+                self.settings,
+                self.output_path,
+                self.thumbnails_path,
+                cache.get(file_path.name),
             )
+            for file_path in file_paths
+        ]
 
-            index_file.write(
-                """\
-html {
-    scroll-behavior: smooth;
-}
-
-@media print {
-    nav {
-        display: none;
-    }
-
-    .file img, .file video {
-        max-width: 100%;
-    }
-
-    p {
-        margin: 0 0 2em;
-    }
-
-    p.return-to-gallery {
-        display: none;
-    }
-}
-
-@media
-    screen and (max-width: 768px),
-
-    /* Tablets and smartphones */
-    screen and (hover: none)
-{
-    body {
-        margin: 1em;
-        padding: 0;
-    }
-
-    h1 {
-        margin-bottom: 0.7rem;
-    }
-
-    nav {
-        display: none;
-    }
-
-    .file {
-        text-align: center;
-        margin: 0 0 2em;
-    }
-
-    .file img, .file video {
-        max-width: 100%;
-        max-height: calc(100vh - 4.5em);
-    }
-}
-
-@media
-    screen and (min-width: 768px) and (hover: hover),
+        for future in futures:
+            media_file = future.result()
 
-    /* IE10 and IE11 (they don't support (hover: hover) */
-    screen and (min-width: 768px) and (-ms-high-contrast: none),
-    screen and (min-width: 768px) and (-ms-high-contrast: active)
-{
-    body {
-        margin: 0;
-        padding: 0;
-    }
+            if media_file is None:
+                continue
 
-    h1 {
-        background: inherit;
-        position: fixed;
-        margin: 0;
-        padding: 2rem 4rem 1rem;
-        top: 0;
-        left: 0;
-        height: 2rem;
-        width: calc(100% - 10rem);
-    }
+            files.append(media_file)
 
-    p.return-to-gallery {
-        background: inherit;
-        position: fixed;
-        margin: 0;
-        padding: 0 4rem;
-        top: 5rem;
-        height: 2rem;
-        width: calc(100% - 10rem);
-    }
+            if isinstance(media_file, ImageFile):
+                new_cache[media_file.filename] = media_file.cache_entry
 
-    nav {
-        top: 7rem;
-        left: 4rem;
-        max-height: calc(100% - 5.6rem);
-        width: calc(40% - 4rem);
-        display: flex;
-        flex-direction: row;
-        flex-wrap: wrap;
-        align-items: flex-start;
-        margin: -0.4rem -0.4rem 0;
-        overflow: auto;
-        position: fixed;
-    }
+        if self.settings.sort_key == "timestamp":
+            # Files without a timestamp go last, in the order they were found
+            now = datetime.now(timezone.utc)
+            files.sort(key=lambda file: file.timestamp or now)
+        elif self.settings.sort_key == "filename":
+            files.sort(key=lambda file: file.filename)
 
-    #photos {
-        margin-top: 7rem;
-        margin-left: calc(40% + 1em);
-        width: calc(60% - 5em);
-    }
+        write_cache(cache_path, new_cache)
 
-    nav a {
-        margin: 0.4em;
-        text-decoration: none;
-        position: relative;
-    }
+        self.write_album_index(files)
 
-    nav a.video-thumbnail:before {
-        color: #f8f8f8;
-        background: #00000099;
-        content: "▶";
-        position: absolute;
-        top: calc(50% - 0.7em - 0.05em);
-        left: calc(50% - 0.5em - 0.3em);
-        font-size: 1.5em;
-        padding: 0.05em 0.2em 0.05em 0.4em;
-        width: 1em;
-        height: 1.4em;
-    }
+    def write_album_index(self, files: List[Union[ImageFile, VideoFile]]):
+        """Generate an HTML file for an album."""
+        index_file_path = self.output_path.joinpath("index.html")
 
-    .file {
-        text-align: center;
-        margin: -7rem 0 2em;
-        padding-top: 7em;
-    }
+        parts: List[str] = [get_page_head(self.settings, self.title_html)]
 
-    .file img, .file video {
-        max-width: 100%;
-        max-height: calc(100vh - 10.5em);
-    }
-}
-  </style>
-"""
-            )
+        parts.append(ALBUM_STYLESHEET)
 
-            index_file.write(
-                f"""\
+        parts.append(
+            f"""\
+  </style>
 </head>
 <body>
-  <h1>{self.settings.title}</h1>
+  <h1>{self.title_html}</h1>
   <p class="return-to-gallery"><a href="../index.html">Return to gallery</a></p>
 """
-            )
+        )
 
-            if len(files) == 0:
-                index_file.write(
-                    """\
+        if len(files) == 0:
+            parts.append(
+                """\
   <p>This album does not contain any photos or videos.</p>
 """
-                )
-            else:
-                index_file.write(
-                    """\
+            )
+        else:
+            parts.append(
+                """\
   <div id="album">
     <nav>
 """
-                )
+            )
 
-                for file, idx in zip(files, range(1, len(files) + 1)):
-                    thumbnail_html = file.get_thumbnail_html(idx)
-                    index_file.write(f"      {thumbnail_html}\n")
+            parts.extend(
+                f"      {file.get_thumbnail_html(idx)}\n"
+                for idx, file in enumerate(files, 1)
+            )
 
-                index_file.write(
-                    """\
+            parts.append(
+                """\
     </nav>
     <div id="photos">
 """
-                )
+            )
 
-                for file, idx in zip(files, range(1, len(files) + 1)):
-                    file_html = file.get_html()
-                    index_file.write(
-                        f'      <p id="file-{idx}" class="file">{file_html}</p>\n'
-                    )
+            parts.extend(
+                f'      <p id="file-{idx}" class="file">{file.get_html()}</p>\n'
+                for idx, file in enumerate(files, 1)
+            )
 
-                index_file.write(
-                    """\
+            parts.append(
+                """\
     </div>
   </div>
 """
-                )
+            )
 
-            index_file.write(
-                """\
+        parts.append(
+            """\
 </body>
 </html>
 """
-            )
+        )
+
+        write_index_file(index_file_path, parts)
 
     def get_html(self):
         """Return the HTML tag for navigating to this album."""
         return (
             f'<a href="{self.settings.output_directory}/index.html">'
-            f"{self.settings.title}"
+            f"{self.title_html}"
             "</a>"
         )
 
@@ -984,14 +1374,27 @@ html {
 class Gallery:
     """Looks for albums in subdirectories and generates a gallery page for them."""
 
+    __slots__ = (
+        "path",
+        "output_path",
+        "title_html",
+        "private_title_html",
+        "settings",
+    )
+
     path: Path
     output_path: Path
+    title_html: str
+    private_title_html: str
 
-    settings: PageSettings = PageSettings()
+    settings: PageSettings
 
     def __init__(self, path: Path):
         self.path = path
 
+        # Each gallery starts from the defaults, not from the previous one's
+        self.settings = PageSettings()
+
     def generate(self) -> None:
         """Start the process of album generation."""
         logger.debug("Generating gallery for <%s>", self.path)
@@ -1003,21 +1406,29 @@ class Gallery:
         """Retrieve the settings for the gallery."""
         settings_path = self.path.joinpath(GALLERY_SETTINGS_FILENAME)
 
-        if not os.path.exists(settings_path):
-            raise RuntimeError(f"Unable to find settings file at <{settings_path}>")
+        # Opening the file is the existence check
+        try:
+            with open(settings_path, "rb") as settings_file:
+                settings = tomllib.load(settings_file)
+        except FileNotFoundError as err:
+            raise RuntimeError(
+                f"Unable to find settings file at <{settings_path}>"
+            ) from err
+        except tomllib.TOMLDecodeError as err:
+            raise RuntimeError(f"Unable to read gallery settings: {err}") from err
 
-        with open(settings_path, "rb") as settings_file:
-            try:
-                settings = tomli.load(settings_file)
-            except tomli.TOMLDecodeError as err:
-                raise RuntimeError(f"Unable to read gallery settings: {err}") from err
+        for attr in SETTING_NAMES & settings.keys():
+            setattr(self.settings, attr, settings[attr])
 
-        for attr in dir(self.settings):
-            if attr.startswith("__") or attr in ["path", "output_path"]:
-                continue
+        self.settings.check_colors()
+        self.title_html = html.escape(str(self.settings.title))
+        self.private_title_html = html.escape(str(self.settings.private_gallery_title))
 
-            if attr in settings:
-                setattr(self.settings, attr, settings[attr])
+        if self.settings.executor not in EXECUTORS:
+            raise RuntimeError(
+                f"Unknown executor <{self.settings.executor}>; "
+                f"expected one of: {', '.join(EXECUTORS)}"
+            )
 
         if self.settings.output_directory is None:
             self.settings.output_directory = "gallery"
@@ -1030,199 +1441,145 @@ class Gallery:
 
     def create_gallery(self):
         """Find the album subdirectories and process them."""
-        os.makedirs(self.output_path, mode=DEFAULT_PERMISSIONS, exist_ok=True)
-
-        albums = []
-
-        for album_path in Path(self.path).glob("*"):
-            album_settings_path = album_path.joinpath("album.toml")
-
-            if album_settings_path.exists():
-                try:
-                    album = Album(album_path, self.output_path)
-                    album.generate(self.settings)
-
-                    albums.append(album)
-                except SettingsFileError as err:
-                    logger.error("Unable to generate album: %s", err)
-
-        albums.sort(key=lambda album: album.settings.title)
+        ensure_directory(self.output_path)
+
+        with os.scandir(self.path) as entries:
+            album_paths = [
+                Path(entry.path)
+                for entry in entries
+                if entry.is_dir()
+                and os.path.isfile(os.path.join(entry.path, ALBUM_SETTINGS_FILENAME))
+            ]
+
+        # Albums are generated in threads so that reading one album's settings
+        # and files overlaps with processing another's; the files of every
+        # album share one pool of workers, so the CPU isn't oversubscribed
+        with EXECUTORS[self.settings.executor]() as file_executor:
+            # A process pool forks its workers on the first submit; do that now,
+            # while this is the only thread, since forking once the album
+            # threads are running can deadlock the children
+            file_executor.submit(os.getpid).result()
+
+            with ThreadPoolExecutor() as album_executor:
+                futures = [
+                    album_executor.submit(
+                        self.generate_album, album_path, file_executor
+                    )
+                    for album_path in album_paths
+                ]
+
+                albums = [
+                    album
+                    for album in (future.result() for future in futures)
+                    if album is not None
+                ]
+
+        public_albums: List[Album] = []
+        private_albums: List[Album] = []
+        for album in albums:
+            if not album.include_in_gallery:
+                continue
 
-        public_albums = list(
-            filter(
-                lambda album: album.settings.is_public and album.include_in_gallery,
-                albums,
-            )
-        )
-        private_albums = list(
-            filter(
-                lambda album: not album.settings.is_public and album.include_in_gallery,
-                albums,
-            )
-        )
+            if album.settings.is_public:
+                public_albums.append(album)
+            else:
+                private_albums.append(album)
 
-        self.write_gallery_index("index.html", self.settings.title, public_albums)
+        public_albums.sort(key=ALBUM_SORT_KEY)
+        self.write_gallery_index("index.html", self.title_html, public_albums)
 
         private_gallery_index_filename = self.settings.private_gallery_index_filename
-        if private_gallery_index_filename is not None:
+        if private_gallery_index_filename is None:
+            return
+
+        if len(private_albums) == 0:
+            # Don't leave a private index around that links to albums which
+            # are now public or gone
+            try:
+                os.unlink(self.output_path.joinpath(private_gallery_index_filename))
+            except FileNotFoundError:
+                pass
+        else:
+            private_albums.sort(key=ALBUM_SORT_KEY)
             self.write_gallery_index(
                 private_gallery_index_filename,
-                self.settings.private_gallery_title,
+                self.private_title_html,
                 private_albums,
             )
 
-    def write_gallery_index(self, filename: str, title: str, albums: List[Album]):
-        """Generate an HTML file for an album."""
-        index_file_path = self.output_path.joinpath(filename)
-
-        if self.settings.favicon_href is None:
-            favicon_html = ""
-        else:
-            favicon_html = (
-                "\n"
-                '  <link rel="icon" type="image/x-icon" '
-                f'href="{self.settings.favicon_href}">'
-            )
-
-        with open(index_file_path, "w", encoding="utf-8") as index_file:
-            index_file.write(
-                f"""\
-<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="utf-8">
-  <title>{title}</title>
-  <meta http-equiv="X-UA-Compatible" content="IE=edge">
-  <meta property="og:title" content="{title}">
-  <meta name="twitter:title" content="{title}">{favicon_html}
-  <style>
-body {{
-    color: {self.settings.foreground_color};
-    background: {self.settings.background_color};
-    font-family: sans-serif;
-}}
-
-@media screen {{
-    a {{
-        color: {self.settings.link_color}
-    }}
-}}
-
-"""
-            )
-
-            index_file.write(
-                """\
-html {
-    scroll-behavior: smooth;
-}
-
-@media
-    screen and (max-width: 768px),
-
-    /* Tablets and smartphones */
-    screen and (hover: none)
-{
-    body {
-        margin: 1em;
-        padding: 0;
-    }
-
-    h1 {
-        margin-bottom: 0.7rem;
-    }
-
-    nav ul {
-        margin: 0;
-        padding: 0;
-        line-height: 2em;
-    }
-
-    li {
-        list-style: none;
-    }
-}
-
-@media
-    screen and (min-width: 768px) and (hover: hover),
+    def generate_album(
+        self, album_path: Path, file_executor: Executor
+    ) -> Optional[Album]:
+        """Generate the album in album_path, or return None if that fails."""
+        try:
+            album = Album(album_path, self.output_path)
+            album.generate(self.settings, file_executor)
+        except SettingsFileError as err:
+            logger.error("Unable to generate album: %s", err)
+            return None
 
-    /* IE10 and IE11 (they don't support (hover: hover) */
-    screen and (min-width: 768px) and (-ms-high-contrast: none),
-    screen and (min-width: 768px) and (-ms-high-contrast: active)
-{
-    body {
-        margin: 0;
-        padding: 0;
-    }
+        return album
 
-    h1 {
-        margin: 0;
-        padding: 2rem 4rem 1rem;
-        height: 2rem;
-    }
+    def write_gallery_index(self, filename: str, title_html: str, albums: List[Album]):
+        """Generate an HTML file for an album."""
+        index_file_path = self.output_path.joinpath(filename)
 
-    nav ul {
-        margin: 0;
-        padding: 0 4rem;
-    }
+        parts: List[str] = [get_page_head(self.settings, title_html)]
 
-    li {
-        list-style: none;
-        margin-bottom: 1em;
-    }
+        parts.append(GALLERY_STYLESHEET)
 
-    p {
-        margin: 0 4rem;
-    }
-}
+        parts.append(
+            """\
   </style>
 """
-            )
+        )
 
-            index_file.write(
-                f"""\
+        parts.append(
+            f"""\
 </head>
 <body>
-  <h1>{title}</h1>
+  <h1>{title_html}</h1>
 """
-            )
+        )
 
-            if len(albums) == 0:
-                index_file.write(
-                    """\
+        if len(albums) == 0:
+            parts.append(
+                """\
   <p>There are no albums in this gallery.</p>
 """
-                )
-            else:
-                index_file.write(
-                    """\
+            )
+        else:
+            parts.append(
+                """\
   <nav>
     <ul>
 """
-                )
+            )
 
-                for album in albums:
-                    album_html = album.get_html()
-                    index_file.write(f"      <li>{album_html}</li>\n")
+            parts.extend(f"      <li>{album.get_html()}</li>\n" for album in albums)
 
-                index_file.write(
-                    """\
+            parts.append(
+                """\
     </ul>
   </nav>
 """
-                )
+            )
 
-            index_file.write(
-                """\
+        parts.append(
+            """\
 </body>
 </html>
 """
-            )
+        )
 
+        write_index_file(index_file_path, parts)
+
+
+def setup_logging() -> None:
+    """Send log messages to stderr, unless a handler has already been set up."""
+    if logger.handlers:
+        return
 
-def main() -> None:
-    """Called when the program is invoked."""
-    logger.setLevel(logging.INFO)
     handler = logging.StreamHandler()
     handler.setFormatter(
         logging.Formatter(
@@ -1233,28 +1590,47 @@ def main() -> None:
     )
     logger.addHandler(handler)
 
+
+def main() -> None:
+    """Called when the program is invoked."""
+    logger.setLevel(logging.INFO)
+    setup_logging()
+
+    # TODO: Add option -v or --verbose to print processing information (e.g. strip_gps)
+    # TODO: Add option -r or --reprocess to force program to reprocess files that exist
+    # TODO: Add option -h or --hidden-index to force program to generate index for hidden albums
+    parser = argparse.ArgumentParser(
+        description="Generate static HTML galleries of photos and videos."
+    )
+    parser.add_argument(
+        "-d", "--debug", action="store_true", help="print debugging information"
+    )
+    parser.add_argument(
+        "dir_paths",
+        nargs="*",
+        type=Path,
+        metavar="DIR_NAME",
+        help="gallery directory (default: the current working directory)",
+    )
+    args = parser.parse_args()
+
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+
+    # Pillow-SIMD versions carry a ".postN" suffix
+    logger.debug(
+        "Using Pillow %s (libjpeg-turbo: %s)",
+        Image.__version__,
+        features.version_feature("libjpeg_turbo") or "no",
+    )
+
     # If any directories were specified, use them;
     # otherwise, default to current working directory
-    dir_names = []
-
-    for arg in sys.argv[1:]:
-        # TODO: Add option -v or --verbose to print processing information (e.g. strip_gps)
-        # TODO: Add option -r or --reprocess to force program to reprocess files that exist
-        # TODO: Add option -h or --hidden-index to force program to generate index for hidden albums
-        if arg in ["-d", "--debug"]:
-            logger.setLevel(logging.DEBUG)
-        elif arg in ["-h", "--help"]:
-            print(f"Usage: {sys.argv[0]} [-d|--debug] DIR_NAME...")
-            sys.exit(0)
-        else:
-            dir_names.append(arg)
-
-    if len(dir_names) == 0:
-        dir_names.append(os.getcwd())
+    dir_paths = args.dir_paths or [Path.cwd()]
 
-    for dir_name in dir_names:
+    for dir_path in dir_paths:
         try:
-            gallery = Gallery(Path(dir_name))
+            gallery = Gallery(dir_path)
             gallery.generate()
         except RuntimeError as err:
             logger.error(err)